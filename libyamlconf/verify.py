@@ -2,15 +2,44 @@
 Verify the loaded configuration data.
 """
 
+import os
 import logging
 
 from pathlib import Path
-from typing import Type, Any
+from typing import Type, Any, Iterator
 
 from pydantic import BaseModel
 from deepdiff import DeepDiff
 
-from libyamlconf.yaml import YamlLoader, _contains_path, _get_paths, _invalid_config, _is_url
+from libyamlconf.yaml import YamlLoader, _compile_paths, _invalid_config, _is_url, _log_enabled
+
+
+def _extra_keys(data: Any, model_data: Any, prefix: str = "") -> Iterator[str]:
+    """
+    Find the keys of the loaded data which are not part of the model data.
+
+    Dicts are compared by keys, and matching values are walked in parallel.
+    List entries are compared by position.
+
+    >>> list(_extra_keys({"a": 1, "b": {"c": 2, "d": 3}}, {"a": 1, "b": {"c": 2}}))
+    ['b.d']
+
+    :param data: Loaded config data.
+    :param model_data: Data of the Pydantic model.
+    :param prefix: Key path of the given data.
+    :yields: Dotted key paths contained in data but not in model_data.
+    """
+    if isinstance(data, dict) and isinstance(model_data, dict):
+        for key, value in data.items():
+            path = f"{prefix}.{key}" if prefix else str(key)
+            if key not in model_data:
+                yield path
+            else:
+                yield from _extra_keys(value, model_data[key], path)
+
+    elif isinstance(data, list) and isinstance(model_data, list):
+        for index, (value, model_value) in enumerate(zip(data, model_data)):
+            yield from _extra_keys(value, model_value, f"{prefix}[{index}]")
 
 
 def load_and_verify(
@@ -35,17 +64,41 @@ def load_and_verify(
 
     logging.debug("Loaded model: %s (%s)", model, type(model))
 
+    if not _log_enabled(logging.WARNING):
+        # The check for not used parameters only logs a warning.
+        return instance
+
     # Check for not used parameters
     model_data = instance.model_dump()
-    if model_data != data:
-        diff = DeepDiff(data, model_data)
-        for key in diff.keys():
-            if "removed" in key:  # pragma: no branch
-                logging.warning("The config file contains not used parameters! %s", diff[key])
+    extra_keys = list(_extra_keys(data, model_data))
+    if extra_keys:
+        logging.warning("The config file contains not used parameters! %s", extra_keys)
+
+        if _log_enabled(logging.DEBUG):
+            logging.debug("Difference of config data and model: %s", DeepDiff(data, model_data))
 
     return instance
 
 
+def _file_exists(file: str, stat_cache: dict[str, bool]) -> bool:
+    """
+    Test if a file or directory exists.
+
+    :param file: Path of the file or directory.
+    :param stat_cache: Results of already tested paths.
+    :return: True if the file or directory exists.
+    """
+    if file not in stat_cache:
+        try:
+            # Like Path(""), an empty path refers to the current directory.
+            os.stat(file or ".")
+            stat_cache[file] = True
+        except (OSError, ValueError):
+            # Like Path.exists, also treat symlink loops and invalid paths as not existing.
+            stat_cache[file] = False
+    return stat_cache[file]
+
+
 def verify_files_exist(model: BaseModel, relative_path_keys: list[list[str]]) -> None:
     """
     Verify that the files referenced by relative_path_keys exist.
@@ -54,11 +107,19 @@ def verify_files_exist(model: BaseModel, relative_path_keys: list[list[str]]) ->
         and the value of each path needs ot be a Path and the pointed file or directory needs to exist.
     """
     data = model.model_dump()
+    stat_cache: dict[str, bool] = {}
+
+    matches: dict[tuple[str, ...], list[dict]] = {}
+    trie = _compile_paths(tuple(tuple(path) for path in relative_path_keys))
+    for match, entry in trie.matches(data):
+        matches.setdefault(match, []).append(entry)
+
     for path in relative_path_keys:
-        if not _contains_path(data, path):
+        entries = matches.get(tuple(path), [])
+        if not entries:
             _invalid_config(f"The path {path} is not contained in the model {model}!")
 
-        for entry in _get_paths(data, path):
+        for entry in entries:
             value = entry[path[-1]]
 
             if _is_url(value, "Found and skipped URL %s.", logging.INFO):
@@ -69,10 +130,10 @@ def verify_files_exist(model: BaseModel, relative_path_keys: list[list[str]]) ->
                     if _is_url(item, "Found and skipped URL %s.", logging.INFO):
                         continue
 
-                    file = Path(item)
-                    if not file.exists():
+                    file = os.fspath(item)
+                    if not _file_exists(file, stat_cache):
                         _invalid_config(f"The file {file} referenced by {path} does not exist!")
             else:
-                file = Path(value)
-                if not file.exists():
+                file = os.fspath(value)
+                if not _file_exists(file, stat_cache):
                     _invalid_config(f"The file {file} referenced by {path} does not exist!")
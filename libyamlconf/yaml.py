@@ -5,13 +5,33 @@ This module implements the hierarchical YAML parsing.
 """
 
 import os
+import copy
+import stat
 import logging
+import functools
 
+from itertools import islice
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable, Iterator
 
 import yaml
 
+try:
+    from yaml import CSafeLoader as _SafeLoader
+except ImportError:  # pragma: no cover
+    # PyYAML was built without libyaml, fall back to the pure Python loader.
+    from yaml import SafeLoader as _SafeLoader  # type: ignore[assignment]
+
+
+# Marker for missing values.
+_MISSING = object()
+
+# Check if a log level is enabled, used to skip log calls with large arguments.
+_log_enabled = logging.getLogger().isEnabledFor
+
+# Parsed YAML files, keyed by real file path. The values are modification time, size and data.
+_PARSE_CACHE: dict[str, tuple[int, int, Any]] = {}
+
 
 class InvalidConfiguration(Exception):
     """Raised if a severe configuration issue is found."""
@@ -32,20 +52,38 @@ def _invalid_config(message: str) -> None:
     raise InvalidConfiguration(message)
 
 
-def _load_yaml(file: Path) -> dict[str, Any]:
+def _load_yaml(file: Path, real_path: str | None = None) -> dict[str, Any]:
     """
     Load the content of a single YAML file.
 
     This function raises an InvalidConfiguration exception if the file does not exist.
+    The parsed data is cached per real file path and parsed again if the modification time or size
+    of the file changed. A copy of the cached data is returned, since the YamlLoader modifies the data in place.
 
     :param file: Path of the YAMl config file to parse.
+    :param real_path: Real path of the file, if already known.
     :return: Data contained in the YAML config file.
     """
-    if not os.path.isfile(file):
+    try:
+        file_stat = os.stat(file)
+        is_file = stat.S_ISREG(file_stat.st_mode)
+    except (OSError, ValueError):
+        is_file = False
+
+    if not is_file:
         _invalid_config(f"Config file {file} does not exist!")
 
-    with open(file, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f)
+    if real_path is None:
+        real_path = os.path.realpath(file)
+
+    cached = _PARSE_CACHE.get(real_path)
+    if cached is None or cached[0] != file_stat.st_mtime_ns or cached[1] != file_stat.st_size:
+        # Parse the whole file content at once, the loader detects the encoding.
+        data = yaml.load(Path(file).read_bytes(), Loader=_SafeLoader)
+        cached = (file_stat.st_mtime_ns, file_stat.st_size, data)
+        _PARSE_CACHE[real_path] = cached
+
+    return copy.deepcopy(cached[2])
 
 
 def _path_generator(data: dict, path: list[str]) -> Any:
@@ -117,6 +155,119 @@ def _get_paths(data: dict, path: list[str]) -> list[Any]:
     return [match for match in generator]
 
 
+class _PathTrie:
+    """
+    Prefix tree of config key paths.
+
+    The trie allows to find the matches of multiple key paths using a single walk through the data.
+    The matching rules are the same as for _path_generator.
+
+    >>> trie = _PathTrie([["test", "hello"], ["test", "other"]])
+    >>> data = { "test": { "hello": "world" } }
+    >>> list(trie.matches(data))
+    [(('test', 'hello'), {'hello': 'world'})]
+    """
+
+    def __init__(self, paths: list[list[str]] = []):
+        """
+        Create a new trie node.
+
+        :param paths: Key paths to add to the trie.
+        """
+        self.children: dict[str, _PathTrie] = {}
+        self.path: tuple[str, ...] | None = None
+        for path in paths:
+            self.add(path)
+
+    def add(self, path: list[str]) -> None:
+        """
+        Add a key path to the trie.
+
+        :param path: Keys path.
+        """
+        node = self
+        for key in path:
+            node = node.children.setdefault(key, _PathTrie())
+        node.path = tuple(path)
+
+    def matches(self, data: Any) -> Iterator[tuple[tuple[str, ...], dict]]:
+        """
+        Find the matches of all key paths in the given data.
+
+        :param data: Data to search for the key paths.
+        :yields: Tuples of the matching key path and the sub-object containing the last key of the path.
+        """
+        if isinstance(data, list):
+            for entry in data:
+                if isinstance(entry, dict):  # pragma: no branch
+                    for key, child in self.children.items():
+                        if key in entry:
+                            if child.path is not None:
+                                yield child.path, entry
+                            if child.children:
+                                yield from child.matches(entry)
+
+        elif isinstance(data, dict):
+            for key, child in self.children.items():
+                if key in data:
+                    if child.path is not None:
+                        yield child.path, data
+                    if child.children:
+                        yield from child.matches(data[key])
+
+
+@functools.lru_cache(maxsize=None)
+def _compile_paths(paths: tuple[tuple[str, ...], ...]) -> _PathTrie:
+    """
+    Compile key paths into a _PathTrie.
+
+    The tries are cached, so loaders and verifications using the same key paths share one trie.
+    The returned trie must not be modified.
+
+    :param paths: Key paths as tuples.
+    :return: Trie containing all given key paths.
+    """
+    return _PathTrie([list(path) for path in paths])
+
+
+def _merge_dict(current: dict, new: Any) -> Any:
+    """
+    Merge a new value into a dict value.
+
+    :param current: Current dict value of the config key.
+    :param new: New value of the config key from the higher config file.
+    :returns: Merged dict, the entries of the new dict win.
+    """
+    if isinstance(new, dict):
+        # Merge dicts, new entry wins.
+        current.update(new)
+        return current
+    else:
+        _invalid_config(f"Unsupported types for merge: {current} ({type(current)}), {new} ({type(new)})")
+
+
+def _merge_list(current: list, new: Any) -> Any:
+    """
+    Merge a new value into a list value.
+
+    :param current: Current list value of the config key.
+    :param new: New value of the config key from the higher config file.
+    :returns: Concatenation of both lists.
+    """
+    if isinstance(new, list):
+        current.extend(new)
+        return current
+    else:
+        _invalid_config(f"Unsupported types for merge: {current} ({type(current)}), {new} ({type(new)})")
+
+
+# Types which are overwritten by the value of the higher config file.
+_SCALAR_TYPES = (str, int, float, Path, bool, type(None))
+
+# Merge functions for the container types.
+_MERGE_DISPATCH: dict[type, Callable[[Any, Any], Any]] = {dict: _merge_dict, list: _merge_list}
+
+
 def _merge_values(current: Any, new: Any) -> Any:
     """
     Merge two values where the key appears multiple times.
@@ -130,27 +281,27 @@ def _merge_values(current: Any, new: Any) -> Any:
     :param new: New value of the config key from the higher config file.
     :returns: Merged config value.
     """
-    if isinstance(current, str) or isinstance(current, int) or isinstance(current, float) or isinstance(current, Path):
+    if current is new:
+        # Only reachable by direct callers, the loader never merges the same object.
+        # Merging a list with itself would duplicate its entries.
+        return current
+
+    merge = _MERGE_DISPATCH.get(type(current))
+    if merge is not None:
+        return merge(current, new)
+
+    if isinstance(current, _SCALAR_TYPES):
         # Overwrite old value for simple types.
         return new
-    elif isinstance(current, dict):
-        if isinstance(new, dict):
-            # Merge dicts, new entry wins.
-            for key in new.keys():
-                current[key] = new[key]
-            return current
-        else:
-            _invalid_config(f"Unsupported types for merge: {current} ({type(current)}), {new} ({type(new)})")
-
-    elif isinstance(current, list):
-        if isinstance(new, list):
-            current.extend(new)
-            return current
-        else:
-            _invalid_config(f"Unsupported types for merge: {current} ({type(current)}), {new} ({type(new)})")
-
-    else:  # pragma: no cover
-        _invalid_config(f"Unsupported types for merge: {current} ({type(current)}), {new} ({type(new)})")
+
+    # Subclasses of the container types.
+    for base, merge in _MERGE_DISPATCH.items():  # pragma: no cover
+        if isinstance(current, base):
+            return merge(current, new)
+
+    _invalid_config(  # pragma: no cover
+        f"Unsupported types for merge: {current} ({type(current)}), {new} ({type(new)})"
+    )
 
 
 def _is_url(value: Any, log: str | None = None, level=logging.DEBUG) -> bool:
@@ -180,55 +331,79 @@ class YamlLoader:
         """
         self._parent_key: str = parent_key
         self._relative_path_keys: list[list[str]] = relative_path_keys
+        self._relative_path_trie: _PathTrie = _compile_paths(tuple(tuple(path) for path in relative_path_keys))
         self._layers: list[Path] = []
-        self._layer_data: dict[Path, dict] = {}
+        self._seen: set[str] = set()
+        self._layer_data: list[dict] = []
         self._data: dict[str, Any] = {}
 
+    @classmethod
+    def clear_cache(cls) -> None:
+        """Drop all cached YAML file content."""
+        _PARSE_CACHE.clear()
+
     def _reset(self) -> None:
         """Reset parsing data structures."""
         self._layers = []
-        self._layer_data = {}
+        self._seen = set()
+        self._layer_data = []
         self._data = {}
 
     def _recursive_load(self, file: Path) -> None:
         """
-        Recursive load the YAML hierarchy.
+        Load the YAML hierarchy.
 
-        :param file: File path of the next YAML config file to load and add.
+        The hierarchy is walked depth first using an explicit stack of files to load,
+        so the order of the layers matches the order of the parent declarations.
+
+        :param file: File path of the top level YAML config file to load.
         """
-        if file in self._layers:
-            logging.warning(
-                "Config file %s is inherited multiple times. It was already loaded and will be skipped now.", file
-            )
-            return
+        parent_key = self._parent_key
+        debug = _log_enabled(logging.DEBUG)
 
-        self._layers.append(file)
-        data = _load_yaml(file)
-        logging.debug("Config data from %s: %s", file, data)
+        stack = [file]
+        while stack:
+            file = stack.pop()
 
-        if not isinstance(data, dict):
-            _invalid_config(f"Unsupported root node type: {data} ({type(data)})")
+            real_path = os.path.realpath(file)
+            if real_path in self._seen:
+                logging.warning(
+                    "Config file %s is inherited multiple times. It was already loaded and will be skipped now.", file
+                )
+                continue
+
+            self._seen.add(real_path)
+            self._layers.append(file)
+            data = _load_yaml(file, real_path)
+            if debug:
+                logging.debug("Config data from %s: %s", file, data)
+
+            if not isinstance(data, dict):
+                _invalid_config(f"Unsupported root node type: {data} ({type(data)})")
+
+            self._layer_data.append(data)
 
-        self._layer_data[file] = data
+            parents = data.get(parent_key, _MISSING)
+            if parents is _MISSING:
+                continue
 
-        if self._parent_key in data:
-            if isinstance(data[self._parent_key], str):
-                next_file = file.parent / Path(data[self._parent_key])
+            parent_dir = file.parent
+            if isinstance(parents, str):
+                next_file = parent_dir / parents
                 logging.debug("%s has single parent file %s", file, next_file)
-                self._recursive_load(next_file)
+                stack.append(next_file)
 
-            elif isinstance(data[self._parent_key], list):
-                logging.debug("%s has multiple parent files: %s", file, data[self._parent_key])
+            elif isinstance(parents, list):
+                logging.debug("%s has multiple parent files: %s", file, parents)
 
-                for parent_file in data[self._parent_key]:
-                    next_file = file.parent / parent_file
-                    logging.debug("Loading parent file %s of %s", next_file, file)
-                    self._recursive_load(next_file)
+                # Push in reverse order to load the first parent first.
+                for parent_file in reversed(parents):
+                    next_file = parent_dir / parent_file
+                    logging.debug("Adding parent file %s of %s", next_file, file)
+                    stack.append(next_file)
 
             else:
-                _invalid_config(
-                    f"Unsupported value for {self._parent_key}: {data[self._parent_key]} ({type(data[self._parent_key])})"
-                )
+                _invalid_config(f"Unsupported value for {parent_key}: {parents} ({type(parents)})")
 
     def _resolve_relative_paths(self) -> None:
         """
@@ -236,82 +411,102 @@ class YamlLoader:
 
         :raises Exception: On unhandled path match - should never happen.
         """
-        for layer in self._layers:
-            for path in self._relative_path_keys:
-                if _contains_path(self._layer_data[layer], path):
-                    entries = _get_paths(self._layer_data[layer], path)
-                    for entry in entries:
-                        value = entry[path[-1]]
-                        if isinstance(value, str):
-                            if _is_url(value, log="Not resolving URL %s."):
-                                continue
-
-                            file = value
-                            resolved = layer.parent / file
+        # Bind the lookups once, they are used for each match.
+        matches = self._relative_path_trie.matches
+        debug = _log_enabled(logging.DEBUG)
+
+        for layer, layer_data in zip(self._layers, self._layer_data):
+            parent_dir = layer.parent
+            matched: set[tuple[str, ...]] = set()
+            for path, entry in matches(layer_data):
+                matched.add(path)
+                key = path[-1]
+                value = entry[key]
+                if isinstance(value, str):
+                    if _is_url(value, log="Not resolving URL %s."):
+                        continue
+
+                    file = value
+                    resolved = parent_dir / file
+                    if debug:
+                        logging.debug("Resolving path %s to %s for config file %s.", file, resolved, layer)
+                    entry[key] = resolved
+                elif isinstance(value, list):
+                    resolved_files: list[str | Path] = []
+                    for file in value:
+                        file = str(file)
+                        if _is_url(file, log="Not resolving URL %s."):
+                            resolved_files.append(file)
+                            continue
+
+                        resolved = parent_dir / file
+                        if debug:
                             logging.debug("Resolving path %s to %s for config file %s.", file, resolved, layer)
-                            entry[path[-1]] = resolved
-                        elif isinstance(value, list):
-                            resolved_files: list[str | Path] = []
-                            for file in value:
-                                file = str(file)
-                                if _is_url(file, log="Not resolving URL %s."):
-                                    resolved_files.append(file)
-                                    continue
-
-                                resolved = layer.parent / file
-                                logging.debug("Resolving path %s to %s for config file %s.", file, resolved, layer)
-                                resolved_files.append(resolved)
-                            # Replace the list content
-                            entry[path[-1]] = resolved_files
-                        else:  # pragma: no cover
-                            # Should never happen
-                            raise Exception(f"Unexpected match {entry} for path {path}!")
-
-                else:
-                    logging.debug("No match for path %s for layer %s.", path, layer)
+                        resolved_files.append(resolved)
+                    # Replace the list content
+                    entry[key] = resolved_files
+                else:  # pragma: no cover
+                    # Should never happen
+                    raise Exception(f"Unexpected match {entry} for path {list(path)}!")
+
+            if debug:
+                for key_path in self._relative_path_keys:
+                    if tuple(key_path) not in matched:
+                        logging.debug("No match for path %s for layer %s.", key_path, layer)
 
     def _merge_config_data(self) -> None:
         """Merge the config layers."""
+        # Bind the lookups once, they are used for each layer and key.
+        parent_key = self._parent_key
+        debug = _log_enabled(logging.DEBUG)
+
         # Init data using lowest layer
-        self._data = self._layer_data[self._layers[-1]]
+        result = self._data = self._layer_data[-1]
 
-        if self._parent_key in self._data:
-            del self._data[self._parent_key]
+        if parent_key in result:
+            del result[parent_key]
 
-        logging.debug("Initial data from layer %s: %s", self._layers[-1], self._data)
+        if debug:
+            logging.debug("Initial data from layer %s: %s", self._layers[-1], result)
 
         if len(self._layers) <= 1:
             logging.debug("No further layers: %s", self._layers)
             return
 
-        layers = self._layers.copy()
-        layers.reverse()
-        # Skip lowest layer
-        layers = layers[1:]
-
-        logging.debug("Merging layers: %s", layers)
-
-        for layer in layers:
-            data = self._layer_data[layer]
-            for key, value in data.items():
-                if key == self._parent_key:
-                    # Do not merge parent key.
-                    continue
-
-                if key not in self._data:
-                    logging.debug("Using key %s with value %s from file %s.", key, value, layer)
-                    self._data[key] = value
-                else:
-                    merged = _merge_values(self._data[key], data[key])
+        # Walk the layers from bottom to top, skipping the lowest layer.
+        if debug:
+            logging.debug("Merging layers: %s", list(islice(reversed(self._layers), 1, None)))
+
+        for index in range(len(self._layers) - 2, -1, -1):
+            layer = self._layers[index]
+            data = self._layer_data[index]
+
+            # Merge the keys contained in both, all other keys are taken over as they are.
+            # Keep the layer order, merges of shared containers depend on it.
+            overlap = [key for key in data if key in result]
+            merged: dict[str, Any] = {}
+            for key in overlap:
+                merged[key] = _merge_values(result[key], data[key])
+                if debug:
                     logging.debug(
                         "Merging values %s and %s for key %s from file %s. Result: %s",
-                        self._data[key],
+                        result[key],
                         data[key],
                         key,
                         layer,
-                        merged,
+                        merged[key],
                     )
-                    self._data[key] = merged
+
+            if debug:
+                merged_keys = set(overlap)
+                for key, value in data.items():
+                    if key != parent_key and key not in merged_keys:
+                        logging.debug("Using key %s with value %s from file %s.", key, value, layer)
+
+            result.update(data)
+            result.update(merged)
+            # Do not merge parent key.
+            result.pop(parent_key, None)
 
     def load(self, file: Path) -> dict[str, Any]:
         """
@@ -324,12 +519,14 @@ class YamlLoader:
 
         self._recursive_load(file)
 
-        logging.info("Config file layers:\n%s", "\n".join([str(layer) for layer in self._layers]))
+        if _log_enabled(logging.INFO):
+            logging.info("Config file layers:\n%s", "\n".join([str(layer) for layer in self._layers]))
 
         self._resolve_relative_paths()
 
         self._merge_config_data()
 
-        logging.info("Resulting configuration:\n%s", self._data)
+        if _log_enabled(logging.INFO):
+            logging.info("Resulting configuration:\n%s", self._data)
 
         return self._data
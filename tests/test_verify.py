@@ -65,6 +65,18 @@ class TestVerify:
         with caplog.at_level(logging.WARNING):
             load_and_verify(config_file, Config, relative_path_keys=files)
             assert "config file contains not used parameters" in caplog.text
+            assert "additional" in caplog.text
+
+    def test_additional_config_not_logged(self, caplog) -> None:
+        """Unused config parameters shall not be checked if warnings are disabled."""
+        config_file = test_data / "not_used.yaml"
+        files = [["referenced"]]
+
+        with caplog.at_level(logging.ERROR):
+            config: Config = load_and_verify(config_file, Config, relative_path_keys=files)
+            assert "config file contains not used parameters" not in caplog.text
+
+        assert config.number == 1
 
     def test_missing_config(self) -> None:
         """Missing config parameter shall raise an ValidationError exception."""
@@ -86,6 +98,22 @@ class TestVerify:
         with pytest.raises(InvalidConfiguration):
             verify_files_exist(config, files)
 
+    def test_referenced_symlink_loop(self, tmp_path: Path) -> None:
+        """A reference to a symlink loop shall raise an InvalidConfiguration exception."""
+        loop = tmp_path / "loop"
+        loop.symlink_to(loop)
+        config = Config(number=1, pi=3.14, hello="world", some="other", referenced=loop)
+
+        with pytest.raises(InvalidConfiguration):
+            verify_files_exist(config, [["referenced"]])
+
+    def test_referenced_invalid_path(self) -> None:
+        """A reference to an invalid path shall raise an InvalidConfiguration exception."""
+        config = Config(number=1, pi=3.14, hello="world", some="other", referenced=Path("invalid\0.file"))
+
+        with pytest.raises(InvalidConfiguration):
+            verify_files_exist(config, [["referenced"]])
+
     def test_invalid_file_spec(self, caplog) -> None:
         """Not existing file key path shall raise an InvalidConfiguration exception."""
         config_file = test_data / "config.yaml"
@@ -1,15 +1,20 @@
 """Tests for YAML parsing."""
 
+import os
+
 from pathlib import Path
 
 import pytest
 
 from libyamlconf.yaml import (
+    _PARSE_CACHE,
     _load_yaml,
     InvalidConfiguration,
     YamlLoader,
     _get_paths,
     _path_generator,
+    _PathTrie,
+    _merge_values,
 )
 
 test_data = Path(__file__).parent / "data" / "yaml"
@@ -241,3 +246,142 @@ class TestYaml:
         assert data["file_list"][0] == config_file.parent / "other" / "include.txt"
         assert data["file_list"][1] == config_file.parent / "other_include.txt"
         assert data["file_list"][2] == "https://www.google.de"
+
+    def test_parse_cache(self, tmp_path: Path) -> None:
+        """Cached YAML data shall be independent per load and invalidated on change."""
+        config = tmp_path / "config.yaml"
+        config.write_text("a: 1\nlist:\n  - x\n", encoding="utf-8")
+        os.utime(config, ns=(1_000_000_000, 1_000_000_000))
+
+        loader = YamlLoader()
+
+        data = loader.load(config)
+        data["list"].append("y")
+        entries = len(_PARSE_CACHE)
+
+        data = loader.load(config)
+        assert data["list"] == ["x"]
+
+        # Same size, only the modification time changes.
+        config.write_text("a: 2\nlist:\n  - x\n", encoding="utf-8")
+        os.utime(config, ns=(2_000_000_000, 2_000_000_000))
+
+        data = loader.load(config)
+        assert data["a"] == 2
+
+        # Size changes, the modification time is kept.
+        config.write_text("a: 3\nlist:\n  - x\n  - z\n", encoding="utf-8")
+        os.utime(config, ns=(2_000_000_000, 2_000_000_000))
+
+        data = loader.load(config)
+        assert data["a"] == 3
+        assert data["list"] == ["x", "z"]
+
+        # The changed file replaces its cache entry.
+        assert len(_PARSE_CACHE) == entries
+        assert _PARSE_CACHE[os.path.realpath(config)][:2] == (2_000_000_000, config.stat().st_size)
+
+        # Different references to the same file share one cache entry.
+        _load_yaml(tmp_path / "." / "config.yaml")
+        assert len(_PARSE_CACHE) == entries
+
+        YamlLoader.clear_cache()
+        assert _PARSE_CACHE == {}
+
+        data = loader.load(config)
+        assert data["a"] == 3
+
+    def test_duplicate_parent_variants(self, tmp_path: Path) -> None:
+        """A parent referenced using different relative paths shall be loaded only once."""
+        (tmp_path / "sub").mkdir()
+        (tmp_path / "base.yaml").write_text("list:\n  - base\n", encoding="utf-8")
+        (tmp_path / "sub" / "middle.yaml").write_text("base: ../base.yaml\nlist:\n  - middle\n", encoding="utf-8")
+        config = tmp_path / "config.yaml"
+        config.write_text("base:\n  - sub/middle.yaml\n  - ./base.yaml\nlist:\n  - config\n", encoding="utf-8")
+
+        loader = YamlLoader()
+
+        data = loader.load(config)
+
+        assert data["list"] == ["base", "middle", "config"]
+        assert len(loader._layers) == 3
+
+    def test_path_trie(self) -> None:
+        """The path trie shall find the same matches as the path generator."""
+        data = _load_yaml(test_data / "complex.yaml")
+
+        paths = [
+            ["group_a", "child_a_1", "list_a_1", "second"],
+            ["group_a", "child_a_1", "list_a_1", "sub_child_a_1_1"],
+            ["group_b", "list_b_1", "sub_child_b_1_3", "second"],
+            ["group_c", "level1", "level2", "level3", "level4"],
+            ["group_c", "level1", "level2"],
+            ["group_d", "l2", "l2s1", "l2s2"],
+            ["group_d", "missing"],
+        ]
+        trie = _PathTrie(paths)
+
+        matches = list(trie.matches(data))
+
+        for path in paths:
+            expected = list(_path_generator(data, path))
+            assert [entry for match, entry in matches if match == tuple(path)] == expected
+
+    def test_merge_values(self) -> None:
+        """Scalars shall be overwritten, containers shall be merged."""
+        assert _merge_values(1, 2) == 2
+        assert _merge_values(True, False) is False
+        assert _merge_values(None, "value") == "value"
+        assert _merge_values(Path("a"), "b") == "b"
+        assert _merge_values({"a": 1, "b": 2}, {"b": 3, "c": 4}) == {"a": 1, "b": 3, "c": 4}
+        assert _merge_values(["a"], ["b"]) == ["a", "b"]
+
+        shared = ["a"]
+        assert _merge_values(shared, shared) == ["a"]
+
+        with pytest.raises(InvalidConfiguration):
+            _merge_values({"a": 1}, ["b"])
+
+        with pytest.raises(InvalidConfiguration):
+            _merge_values(["a"], {"b": 1})
+
+    def test_merge_key_order(self, tmp_path: Path) -> None:
+        """Merged keys shall keep the order of their first appearance in the hierarchy."""
+        (tmp_path / "base.yaml").write_text("b: 1\nlist:\n  - base\na: 2\n", encoding="utf-8")
+        config = tmp_path / "config.yaml"
+        config.write_text("d: 3\nbase: base.yaml\na: 4\nlist:\n  - config\nc: 5\n", encoding="utf-8")
+
+        loader = YamlLoader()
+
+        data = loader.load(config)
+
+        assert list(data.keys()) == ["b", "list", "a", "d", "c"]
+        assert data["a"] == 4
+        assert data["list"] == ["base", "config"]
+
+    def test_merge_shared_container(self, tmp_path: Path) -> None:
+        """Keys sharing a container using a YAML alias shall be merged in layer order."""
+        (tmp_path / "base.yaml").write_text("a: &x\n  - 1\nb: *x\n", encoding="utf-8")
+        config = tmp_path / "config.yaml"
+        config.write_text("base: base.yaml\na:\n  - 2\nb:\n  - 3\n", encoding="utf-8")
+
+        loader = YamlLoader()
+
+        data = loader.load(config)
+
+        assert data["a"] == [1, 2, 3]
+        assert data["b"] == [1, 2, 3]
+
+    def test_duplicate_parent_symlink(self, tmp_path: Path) -> None:
+        """A parent referenced directly and using a symlink shall be loaded only once."""
+        (tmp_path / "base.yaml").write_text("list:\n  - base\n", encoding="utf-8")
+        (tmp_path / "link.yaml").symlink_to(tmp_path / "base.yaml")
+        config = tmp_path / "config.yaml"
+        config.write_text("base:\n  - base.yaml\n  - link.yaml\nlist:\n  - config\n", encoding="utf-8")
+
+        loader = YamlLoader()
+
+        data = loader.load(config)
+
+        assert data["list"] == ["base", "config"]
+        assert len(loader._layers) == 2